@@ -1,8 +1,13 @@
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import base64
 import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 # Get unsplash api to use photo function
 UNSPLASH_ACCESS_KEY = "UNSPLASH_ACCESS_KEY"
@@ -10,12 +15,39 @@ UNSPLASH_SECRET_KEY = "UNSPLASH_SECRET_KEY"
 
 # Get OpenAI API key
 client = OpenAI(api_key="OPENAI_API_KEY")
+async_client = AsyncOpenAI(api_key="OPENAI_API_KEY")
 
 # To get the wordpress upload feature, add your wordpress url, username and password
 WP_URL = "Wordpress URL"
 WP_USER = "username"
 WP_APP_PASSWORD = "password"
 
+_auth_base64 = base64.b64encode(f"{WP_USER}:{WP_APP_PASSWORD}".encode('utf-8')).decode('utf-8')
+
+# (connect, read) timeout so a hung upstream can't block forever
+HTTP_TIMEOUT = (3.05, 27)
+
+# Backoff on connection errors and transient statuses for Unsplash GETs
+_retry = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+)
+
+# Pooled clients so consecutive WordPress/Unsplash calls reuse keep-alive connections.
+# WordPress uses HTTP/2, so requests issued together (see set_wp_featured_image) run as
+# parallel streams on one connection; the transport retries connection failures only,
+# never replaying a sent POST
+wp_http2 = httpx.Client(
+    headers={"Authorization": f"Basic {_auth_base64}"},
+    timeout=httpx.Timeout(HTTP_TIMEOUT[1], connect=HTTP_TIMEOUT[0]),
+    transport=httpx.HTTPTransport(http2=True, retries=3),
+)
+
+unsplash_session = requests.Session()
+unsplash_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=_retry))
+
 # Length guidelines
 LENGTH_GUIDELINES = {
     "short": {
@@ -78,11 +110,19 @@ def get_blog_length():
         print("Invalid input. Please enter 'short', 'medium', or 'long'.")
 
 
-def seo_gpt(task, genre=None):
+def _seo_prompt(task, genre):
     if task == "ideas":
-        prompt = f"{SEO_GPT_PROMPT}\n\nGenerate 3 SEO-optimized blog ideas for the genre: {genre}."
-    else:
-        raise ValueError("Invalid task specified for SEO GPT.")
+        return f"{SEO_GPT_PROMPT}\n\nGenerate 3 SEO-optimized blog ideas for the genre: {genre}."
+    if task == "idea":
+        return (
+            f"{SEO_GPT_PROMPT}\n\nGenerate 1 SEO-optimized blog idea for the genre: {genre}. "
+            "Respond with the blog title only."
+        )
+    raise ValueError("Invalid task specified for SEO GPT.")
+
+
+def seo_gpt(task, genre=None):
+    prompt = _seo_prompt(task, genre)
 
     response = client.chat.completions.create(
         model="gpt-4o-mini",  
@@ -95,6 +135,21 @@ def seo_gpt(task, genre=None):
     return response.choices[0].message.content
 
 
+async def aseo_gpt(task, genre=None):
+    """Async variant of seo_gpt so several idea requests can run concurrently."""
+    prompt = _seo_prompt(task, genre)
+
+    response = await async_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SEO_GPT_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    )
+
+    return response.choices[0].message.content.strip()
+
+
 def reviewer_gpt(ideas):
     prompt = f"{REVIEWER_GPT_PROMPT}\n\nHere are 3 blog ideas: {ideas}. Select the best one and explain your reasoning."
 
@@ -171,7 +226,7 @@ def get_random_unsplash_photo(query):
         f"&client_id={UNSPLASH_ACCESS_KEY}"
     )
     try:
-        response = requests.get(url)
+        response = unsplash_session.get(url, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         image_url = data["urls"]["full"]
@@ -191,119 +246,100 @@ def set_wp_featured_image(post_id, image_url, photographer_name, photographer_li
     sets that media as the Featured Image for the given post_id,
     then:
       - updates alt_text to include the image link & photographer name
-      - appends a credit link to the bottom of the post content
+      - stores the photographer credit in post meta (rendered by wordpress/photo-credit.php)
     """
     WP_API_BASE = "https://YOUR_WORDPRESS_SITE/wp-json/wp/v2"
 
-    auth_str = f"{WP_USER}:{WP_APP_PASSWORD}"
-    auth_bytes = auth_str.encode('utf-8')
-    auth_base64 = base64.b64encode(auth_bytes).decode('utf-8')
-    headers = {
-        "Authorization": f"Basic {auth_base64}"
-    }
+    if not image_url:
+        return
 
-    temp_file_path = None
     try:
-        r = requests.get(image_url, stream=True)
-        r.raise_for_status()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    tmp.write(chunk)
-            temp_file_path = tmp.name
+        with unsplash_session.get(image_url, stream=True, timeout=HTTP_TIMEOUT) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
+                shutil.copyfileobj(r.raw, tmp, length=64 * 1024)
+                temp_file_path = tmp.name
     except Exception as e:
         print("Error downloading Unsplash image:", e)
         return
 
     media_id = None
-    if temp_file_path:
-        file_name = os.path.basename(temp_file_path)
-        media_endpoint = f"{WP_API_BASE}/media"
-        try:
-            with open(temp_file_path, "rb") as img_file:
-                files = {
-                    "file": (file_name, img_file, "image/jpeg")
-                }
-                upload_resp = requests.post(
-                    media_endpoint,
-                    headers=headers,
-                    files=files
-                )
-            upload_resp.raise_for_status()
-            media_data = upload_resp.json()
-            media_id = media_data.get("id")
-        except Exception as e:
-            print("Error uploading image to WordPress:", e)
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-
-
-    if media_id:
-        media_patch_endpoint = f"{WP_API_BASE}/media/{media_id}"
-        alt_text_content = f"{image_url} by {photographer_name}" if photographer_name else image_url
-        alt_text_payload = {
-            "alt_text": alt_text_content
-        }
-        try:
-            patch_alt_resp = requests.post(
-                media_patch_endpoint,
-                headers={**headers, "Content-Type": "application/json"},
-                json=alt_text_payload
-            )
-            patch_alt_resp.raise_for_status()
-        except Exception as e:
-            print("Error setting alt text on media:", e)
-
-    if media_id:
-        post_endpoint = f"{WP_API_BASE}/posts/{post_id}"
-        post_payload = {
-            "featured_media": media_id
-        }
-        try:
-            update_resp = requests.post(
-                post_endpoint,
-                headers={**headers, "Content-Type": "application/json"},
-                json=post_payload
-            )
-            update_resp.raise_for_status()
-        except Exception as e:
-            print("Error setting featured media:", e)
-            return
-
-        try:
-            updated_post = update_resp.json()
-            existing_content = updated_post.get("content", {}).get("rendered", "")
-
-            credit_html = (
-                f'<p style="font-size:small;">Photo by '
-                f'<a href="{photographer_link}" target="_blank" rel="noopener">'
-                f'{photographer_name}</a> on '
-                f'<a href="https://unsplash.com" target="_blank" rel="noopener">Unsplash</a>.</p>'
+    file_name = os.path.basename(temp_file_path)
+    media_endpoint = f"{WP_API_BASE}/media"
+    try:
+        with open(temp_file_path, "rb") as img_file:
+            files = {
+                "file": (file_name, img_file, "image/jpeg")
+            }
+            upload_resp = wp_http2.post(
+                media_endpoint,
+                files=files
             )
-            new_content = existing_content + credit_html
+        upload_resp.raise_for_status()
+        media_data = upload_resp.json()
+        media_id = media_data.get("id")
+    except Exception as e:
+        print("Error uploading image to WordPress:", e)
+    finally:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
 
-            patch_resp = requests.post(
-                post_endpoint,
-                headers={**headers, "Content-Type": "application/json"},
-                json={"content": new_content}
-            )
-            patch_resp.raise_for_status()
-            print("Featured image set, alt text added, and credit appended.")
-        except Exception as e:
-            print("Error adding credit to post:", e)
+    if not media_id:
+        return
 
+    alt_text_content = f"{image_url} by {photographer_name}" if photographer_name else image_url
+    # Alt text and featured_media are independent, so send them together over wp_http2
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        alt_future = pool.submit(_set_media_alt_text, WP_API_BASE, media_id, alt_text_content)
+        featured_future = pool.submit(
+            _set_featured_media, WP_API_BASE, post_id, media_id, photographer_name, photographer_link
+        )
+    if alt_future.result() and featured_future.result():
+        print("Featured image set, alt text added, and credit saved.")
 
-def publish_to_wordpress(title, content):
-    auth_str = f"{WP_USER}:{WP_APP_PASSWORD}"
-    auth_bytes = auth_str.encode('utf-8')
-    auth_base64 = base64.b64encode(auth_bytes).decode('utf-8')
 
-    headers = {
-        "Authorization": f"Basic {auth_base64}",
-        "Content-Type": "application/json"
+def _set_media_alt_text(wp_api_base, media_id, alt_text_content):
+    media_patch_endpoint = f"{wp_api_base}/media/{media_id}"
+    alt_text_payload = {
+        "alt_text": alt_text_content
     }
+    try:
+        patch_alt_resp = wp_http2.post(
+            media_patch_endpoint,
+            json=alt_text_payload
+        )
+        patch_alt_resp.raise_for_status()
+        return True
+    except Exception as e:
+        print("Error setting alt text on media:", e)
+        return False
+
+
+def _set_featured_media(wp_api_base, post_id, media_id, photographer_name, photographer_link):
+    # Credit is rendered by the photo-credit WP plugin from post meta,
+    # so it goes out with featured_media instead of a second content patch
+    post_endpoint = f"{wp_api_base}/posts/{post_id}"
+    post_payload = {
+        "featured_media": media_id,
+        "meta": {
+            "photographer_name": photographer_name or "",
+            "photographer_link": photographer_link or "",
+        }
+    }
+    try:
+        update_resp = wp_http2.post(
+            post_endpoint,
+            json=post_payload
+        )
+        update_resp.raise_for_status()
+        return True
+    except Exception as e:
+        print("Error setting featured media:", e)
+        return False
 
+
+def publish_to_wordpress(title, content):
     while True:
         status = input("Do you want to publish the post or save it as a draft? (publish/draft): ").strip().lower()
         if status in ['publish', 'draft']:
@@ -317,16 +353,17 @@ def publish_to_wordpress(title, content):
     }
 
     try:
-        response = requests.post(WP_URL, json=post_data, headers=headers)
+        response = wp_http2.post(WP_URL, json=post_data)
         response.raise_for_status()
         post_json = response.json()
         post_id = post_json.get("id")
         print(f"Post successfully {'published' if status == 'publish' else 'saved as draft'} to WordPress! Post ID: {post_id}")
         return post_id  
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
+        # ValueError covers a non-JSON body, which requests used to raise as a RequestException
         print(f"Failed to save post. Error: {str(e)}")
-        if hasattr(response, 'text'):
-            print("Response Content:", response.text)
+        if isinstance(e, httpx.HTTPStatusError):
+            print("Response Content:", e.response.text)
         return None
 
 
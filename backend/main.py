@@ -1,15 +1,189 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from collections import deque
+from cachetools import TTLCache
 import gpt_blog_maker as blog
-import requests
+import asyncio
+import functools
+import hashlib
+import httpx
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 import base64
 import os
-import tempfile
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 
 app = FastAPI()
 
+# WordPress / Unsplash config, resolved once at import instead of per request
+WP_URL = blog.WP_URL
+WP_API_BASE = "https://YOUR_WEBSITE/wp-json/wp/v2"
+UNSPLASH_ACCESS_KEY = blog.UNSPLASH_ACCESS_KEY
+
+_WP_AUTH_HEADER = "Basic " + base64.b64encode(
+    f"{blog.WP_USER}:{blog.WP_APP_PASSWORD}".encode("utf-8")
+).decode("utf-8")
+_WP_JSON_HEADERS = {
+    "Authorization": _WP_AUTH_HEADER,
+    "Content-Type": "application/json"
+}
+
+# Pooled async HTTP clients (one per upstream host) so repeated WordPress/Unsplash
+# calls reuse keep-alive connections instead of paying a new TLS handshake each time
+_http_limits = httpx.Limits(max_keepalive_connections=10, max_connections=20)
+# 3.05s to connect, 27s for everything else, so a hung upstream can't pin a request forever
+_http_timeout = httpx.Timeout(27.0, connect=3.05)
+
+# Transports retry failed connections; http2/limits must be set on the transport itself
+wp_client = httpx.AsyncClient(
+    timeout=_http_timeout,
+    transport=httpx.AsyncHTTPTransport(http2=True, limits=_http_limits, retries=3),
+    headers={"Authorization": _WP_AUTH_HEADER},
+)
+unsplash_client = httpx.AsyncClient(
+    timeout=_http_timeout,
+    transport=httpx.AsyncHTTPTransport(http2=True, limits=_http_limits, retries=3),
+    follow_redirects=True,
+)
+
+def get_wp_client() -> httpx.AsyncClient:
+    """Dependency returning the shared, pre-authenticated WordPress client."""
+    return wp_client
+
+def get_unsplash_client() -> httpx.AsyncClient:
+    """Dependency returning the shared Unsplash client."""
+    return unsplash_client
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Longest Retry-After we are willing to wait inside a request; beyond it the error is returned
+MAX_RETRY_AFTER = 10.0
+
+def _retry_delay(resp, attempt, backoff_factor):
+    """Seconds to wait before the next attempt: Retry-After when given, else exponential."""
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        if retry_after.isdigit():
+            return float(retry_after)
+        try:
+            when = parsedate_to_datetime(retry_after)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return backoff_factor * (2 ** attempt)
+
+async def get_with_backoff(client, url, stream=False, retries=3, backoff_factor=0.3):
+    """
+    GET that retries transient upstream statuses, honoring Retry-After like urllib3's Retry.
+    With stream=True the body is left unread and the caller must aclose() the response.
+    """
+    for attempt in range(retries + 1):
+        resp = await client.send(client.build_request("GET", url), stream=stream)
+        if resp.status_code not in RETRY_STATUSES or attempt == retries:
+            return resp
+        delay = _retry_delay(resp, attempt, backoff_factor)
+        if delay > MAX_RETRY_AFTER:
+            return resp
+        await resp.aclose()
+        await asyncio.sleep(delay)
+
+# Dedicated pool for the blocking OpenAI helpers, kept apart from Starlette's default threadpool
+llm_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm")
+
+# Exact-match cache of LLM results, keyed on the blog.* function and its full arguments
+_llm_cache = TTLCache(maxsize=1024, ttl=3600)
+
+def llm_cache_key(func, *args, **kwargs):
+    raw = orjson.dumps([func.__name__, args, kwargs], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+async def cached_llm(key, coro_factory, fresh=False):
+    """
+    Return the cached result for key, or await coro_factory() and cache what it returns.
+    fresh=True skips the lookup (e.g. a "regenerate" click) but still refreshes the entry.
+    """
+    if not fresh and key in _llm_cache:
+        return _llm_cache[key]
+    result = await coro_factory()
+    _llm_cache[key] = result
+    return result
+
+async def run_llm(func, *args, fresh=False, **kwargs):
+    """Run a synchronous blog.* LLM call on llm_executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await cached_llm(
+        llm_cache_key(func, *args, **kwargs),
+        lambda: loop.run_in_executor(llm_executor, functools.partial(func, *args, **kwargs)),
+        fresh=fresh,
+    )
+
+MAX_BODY_BYTES = 2 * 1024 * 1024
+
+class _BodyTooLarge(Exception):
+    pass
+
+class BodySizeLimitMiddleware:
+    """
+    Answer 413 once a request body passes max_body_bytes. A declared Content-Length is
+    rejected up front; chunked bodies are counted as they are received, so they are
+    never buffered or parsed in full.
+    """
+
+    def __init__(self, app, max_body_bytes):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Once over the limit, drop whatever error response the app builds from the
+            # aborted read; the 413 below is sent instead
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if exceeded and not response_started:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+        await response(scope, receive, send)
+
+# Added before CORSMiddleware so the 413 still carries CORS headers
+app.add_middleware(BodySizeLimitMiddleware, max_body_bytes=MAX_BODY_BYTES)
+
 origins = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -22,12 +196,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def close_clients():
+    await wp_client.aclose()
+    await unsplash_client.aclose()
+    llm_executor.shutdown(wait=False)
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Hello from GPT Blog Maker API!"}
 
+GENRE_PATTERN = r"^[\w\s-]+$"
+
 class IdeaRequest(BaseModel):
-    genre: str
+    genre: str = Field(..., max_length=128, pattern=GENRE_PATTERN)
+    fresh: bool = False
 
 class IdeaResponse(BaseModel):
     ideas: List[str]
@@ -41,132 +224,174 @@ class SelectedIdeaResponse(BaseModel):
 class OutlineRequest(BaseModel):
     idea: str
     length_type: str
+    fresh: bool = False
 
 class OutlineResponse(BaseModel):
     outline: str
 
 class WriterRequest(BaseModel):
-    outline: str
+    outline: str = Field(..., max_length=32_000)
     writing_style: Optional[str] = "Professional, engaging, and informative"
     length_type: str
+    fresh: bool = False
 
 class WriterResponse(BaseModel):
     blog_post: str
 
+class RandomImageResponse(BaseModel):
+    image_url: str
+    photographer_name: str
+    photographer_link: str
+
 class PublishRequest(BaseModel):
     title: str
-    content: str
+    content: str = Field(..., max_length=500_000)
     status: str  
     featured_image_url: Optional[str] = None
     photographer_name: Optional[str] = None
     photographer_link: Optional[str] = None
 
+class PublishResponse(BaseModel):
+    detail: str
+    postId: Optional[int] = None
+    featuredImageUrl: Optional[str] = None
+
 
 @app.post("/generate_ideas", response_model=IdeaResponse)
-def generate_ideas(req: IdeaRequest):
+async def generate_ideas(req: IdeaRequest):
     """Generate 3 SEO-optimized blog ideas based on the given genre."""
     try:
-        ideas_text = blog.seo_gpt(task="ideas", genre=req.genre)
-        return {"ideas": [ideas_text]}
+        async def generate():
+            return list(await asyncio.gather(
+                *(blog.aseo_gpt(task="idea", genre=req.genre) for _ in range(3))
+            ))
+
+        ideas = await cached_llm(
+            llm_cache_key(blog.aseo_gpt, task="idea", genre=req.genre),
+            generate,
+            fresh=req.fresh,
+        )
+        return {"ideas": ideas}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/select_idea", response_model=SelectedIdeaResponse)
-def select_idea(req: SelectIdeaRequest):
+async def select_idea(req: SelectIdeaRequest):
     """Use GPT to pick the 'best' idea."""
     try:
-        best_idea = blog.reviewer_gpt(req.ideas)
+        best_idea = await run_llm(blog.reviewer_gpt, req.ideas)
         return {"selected_idea": best_idea}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/generate_outline", response_model=OutlineResponse)
-def generate_outline(req: OutlineRequest):
+async def generate_outline(req: OutlineRequest):
     """Generate an SEO-optimized outline for a selected idea & length_type."""
     try:
-        outline = blog.outline_gpt(req.idea, req.length_type)
+        outline = await run_llm(blog.outline_gpt, req.idea, req.length_type, fresh=req.fresh)
         return {"outline": outline}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/generate_blog", response_model=WriterResponse)
-def generate_blog(req: WriterRequest):
+async def generate_blog(req: WriterRequest):
     """Generate the full blog post from the outline, style, and length."""
     try:
-        blog_post = blog.writer_gpt(
+        blog_post = await run_llm(
+            blog.writer_gpt,
             outline=req.outline,
             writing_style=req.writing_style,
-            length_type=req.length_type
+            length_type=req.length_type,
+            fresh=req.fresh
         )
         return {"blog_post": blog_post}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/get_random_image")
-def get_random_image(genre: str = Query(...)):
+# Per-genre pool of recent Unsplash photos, rotated on each hit so previews still vary
+IMAGE_POOL_SIZE = 5
+_image_cache = TTLCache(maxsize=256, ttl=60)
+
+@app.get("/get_random_image", response_model=RandomImageResponse)
+async def get_random_image(
+    response: Response,
+    genre: str = Query(..., max_length=128, pattern=GENRE_PATTERN),
+    unsplash: httpx.AsyncClient = Depends(get_unsplash_client),
+):
     """
     Returns a random Unsplash photo for the given genre (orientation=landscape),
     so the front-end can preview it before publishing.
     """
-    UNSPLASH_ACCESS_KEY = blog.UNSPLASH_ACCESS_KEY
-    url = (
-        f"https://api.unsplash.com/photos/random"
-        f"?query={genre}"
-        f"&orientation=landscape"
-        f"&client_id={UNSPLASH_ACCESS_KEY}"
-    )
-    try:
-        resp = requests.get(url)
-        resp.raise_for_status()
-        data = resp.json()
-        image_url = data["urls"]["full"]
-        photographer_name = data["user"]["name"]
-        photographer_link = data["user"]["links"]["html"]
-        return {
-            "image_url": image_url,
-            "photographer_name": photographer_name,
-            "photographer_link": photographer_link,
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error fetching random Unsplash photo: {str(e)}")
-
-@app.post("/publish")
-def publish_blog(req: PublishRequest):
+    key = genre.lower()
+    photos = _image_cache.get(key)
+    if photos is not None:
+        photos.rotate(-1)
+    else:
+        url = (
+            f"https://api.unsplash.com/photos/random"
+            f"?query={genre}"
+            f"&orientation=landscape"
+            f"&count={IMAGE_POOL_SIZE}"
+            f"&client_id={UNSPLASH_ACCESS_KEY}"
+        )
+        try:
+            resp = await get_with_backoff(unsplash, url)
+            resp.raise_for_status()
+            photos = deque(
+                {
+                    "image_url": data["urls"]["full"],
+                    "photographer_name": data["user"]["name"],
+                    "photographer_link": data["user"]["links"]["html"],
+                }
+                for data in orjson.loads(resp.content)
+            )
+            if not photos:
+                raise ValueError(f"no photos found for '{genre}'")
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error fetching random Unsplash photo: {str(e)}")
+        _image_cache[key] = photos
+
+    # The front-end re-requests the same URL for "another image", so the browser (and any
+    # shared proxy) must revalidate instead of replaying one pick; rotation happens server-side
+    response.headers["Cache-Control"] = "private, no-cache"
+    return photos[0]
+
+@app.post("/publish", response_model=PublishResponse)
+async def publish_blog(
+    req: PublishRequest,
+    wp: httpx.AsyncClient = Depends(get_wp_client),
+    unsplash: httpx.AsyncClient = Depends(get_unsplash_client),
+):
     """
     Publish or draft the blog post on WordPress, using the
     featured_image_url (and photographer info) the client already fetched.
     """
     try:
-        WP_URL = blog.WP_URL
-        WP_USER = blog.WP_USER
-        WP_APP_PASSWORD = blog.WP_APP_PASSWORD
-
-        auth_str = f"{WP_USER}:{WP_APP_PASSWORD}"
-        auth_bytes = auth_str.encode("utf-8")
-        auth_base64 = base64.b64encode(auth_bytes).decode("utf-8")
-
-        headers = {
-            "Authorization": f"Basic {auth_base64}",
-            "Content-Type": "application/json"
-        }
-
         post_data = {
             "title": req.title,
             "content": req.content,
             "status": req.status
         }
-        response = requests.post(WP_URL, json=post_data, headers=headers)
+        if req.featured_image_url:
+            # Credit is rendered by the photo-credit WP plugin from these meta fields
+            post_data["meta"] = {
+                "photographer_name": req.photographer_name or "",
+                "photographer_link": req.photographer_link or "",
+            }
+        body = orjson.dumps(post_data)
+        response = await wp.post(WP_URL, content=body, headers=_WP_JSON_HEADERS)
         response.raise_for_status()
         post_json = response.json()
         new_post_id = post_json.get("id")
 
         featured_image_url = None
         if new_post_id and req.featured_image_url:
-            set_wp_featured_image(
+            await set_wp_featured_image(
                 post_id=new_post_id,
                 image_url=req.featured_image_url,
                 photographer_name=req.photographer_name or "",
-                photographer_link=req.photographer_link or "",
+                wp=wp,
+                unsplash=unsplash,
             )
             featured_image_url = req.featured_image_url
 
@@ -179,100 +404,94 @@ def publish_blog(req: PublishRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-def set_wp_featured_image(post_id, image_url, photographer_name, photographer_link):
+async def set_wp_featured_image(post_id, image_url, photographer_name, wp, unsplash):
     """
-    1. Download image to temp file
-    2. Upload to WP (multipart/form-data)
-    3. Set as featured, update alt_text, append credit
+    1. Stream image from Unsplash straight into a WP media upload
+    2. Set as featured, update alt_text
+    The photo credit comes from the post meta sent by publish_blog.
     """
-    WP_API_BASE = "https://YOUR_WEBSITE/wp-json/wp/v2"
-    WP_USER = blog.WP_USER
-    WP_APP_PASSWORD = blog.WP_APP_PASSWORD
-
-    auth_str = f"{WP_USER}:{WP_APP_PASSWORD}"
-    auth_bytes = auth_str.encode("utf-8")
-    auth_base64 = base64.b64encode(auth_bytes).decode("utf-8")
-    headers = {
-        "Authorization": f"Basic {auth_base64}"
-    }
-
-    temp_file_path = None
-    try:
-        r = requests.get(image_url, stream=True)
-        r.raise_for_status()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    tmp.write(chunk)
-            temp_file_path = tmp.name
-    except Exception as e:
-        print("Error downloading Unsplash image:", e)
+    if not image_url:
         return
 
     media_id = None
-    if temp_file_path:
-        file_name = os.path.basename(temp_file_path)
-        media_endpoint = f"{WP_API_BASE}/media"
+    media_endpoint = f"{WP_API_BASE}/media"
+    try:
+        r = await get_with_backoff(unsplash, image_url, stream=True)
         try:
-            with open(temp_file_path, "rb") as img_file:
-                files = {
-                    "file": (file_name, img_file, "image/jpeg")
-                }
-                upload_resp = requests.post(media_endpoint, headers=headers, files=files)
-            upload_resp.raise_for_status()
-            media_data = upload_resp.json()
-            media_id = media_data.get("id")
-        except Exception as e:
-            print("Error uploading image to WordPress:", e)
+            r.raise_for_status()
+            # Raw-body upload: WP takes the file name from Content-Disposition,
+            # so the image is piped through without a temp file or multipart buffer
+            upload_headers = {
+                "Content-Type": "image/jpeg",
+                "Content-Disposition": f'attachment; filename="unsplash-{post_id}.jpg"',
+            }
+            if "Content-Length" in r.headers and "Content-Encoding" not in r.headers:
+                upload_headers["Content-Length"] = r.headers["Content-Length"]
+            upload_resp = await wp.post(
+                media_endpoint,
+                content=r.aiter_bytes(chunk_size=64 * 1024),
+                headers=upload_headers
+            )
         finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+            await r.aclose()
+        upload_resp.raise_for_status()
+        media_data = upload_resp.json()
+        media_id = media_data.get("id")
+    except Exception as e:
+        print("Error streaming image to WordPress:", e)
+        return
 
-    if media_id:
-        media_patch_endpoint = f"{WP_API_BASE}/media/{media_id}"
-        alt_text_content = f"{image_url} by {photographer_name}" if photographer_name else image_url
-        try:
-            patch_alt_resp = requests.post(
-                media_patch_endpoint,
-                headers={**headers, "Content-Type": "application/json"},
-                json={"alt_text": alt_text_content}
-            )
-            patch_alt_resp.raise_for_status()
-        except Exception as e:
-            print("Error setting alt text on media:", e)
+    if not media_id:
+        return
 
-    if media_id:
-        post_endpoint = f"{WP_API_BASE}/posts/{post_id}"
-        try:
-            update_resp = requests.post(
-                post_endpoint,
-                headers={**headers, "Content-Type": "application/json"},
-                json={"featured_media": media_id}
-            )
-            update_resp.raise_for_status()
-            updated_post = update_resp.json()
-        except Exception as e:
-            print("Error setting featured media:", e)
-            return
+    alt_text_content = f"{image_url} by {photographer_name}" if photographer_name else image_url
+    # Alt text and featured_media are independent, so run them concurrently
+    await asyncio.gather(
+        _set_media_alt_text(wp, media_id, alt_text_content),
+        _set_featured_media(wp, post_id, media_id),
+    )
+
+
+async def _set_media_alt_text(wp, media_id, alt_text_content):
+    media_patch_endpoint = f"{WP_API_BASE}/media/{media_id}"
+    try:
+        patch_alt_resp = await wp.post(
+            media_patch_endpoint,
+            content=orjson.dumps({"alt_text": alt_text_content}),
+            headers=_WP_JSON_HEADERS
+        )
+        patch_alt_resp.raise_for_status()
+    except Exception as e:
+        print("Error setting alt text on media:", e)
+
+
+async def _set_featured_media(wp, post_id, media_id):
+    post_endpoint = f"{WP_API_BASE}/posts/{post_id}"
+    try:
+        update_resp = await wp.post(
+            post_endpoint,
+            content=orjson.dumps({"featured_media": media_id}),
+            headers=_WP_JSON_HEADERS
+        )
+        update_resp.raise_for_status()
+    except Exception as e:
+        print("Error setting featured media:", e)
 
-        try:
-            existing_content = updated_post.get("content", {}).get("rendered", "")
-            credit_html = (
-                f'<p style="font-size:small;">Photo by '
-                f'<a href="{photographer_link}" target="_blank" rel="noopener">'
-                f'{photographer_name}</a> on '
-                f'<a href="https://unsplash.com" target="_blank" rel="noopener">Unsplash</a>.</p>'
-            )
-            new_content = existing_content + credit_html
-            patch_resp = requests.post(
-                post_endpoint,
-                headers={**headers, "Content-Type": "application/json"},
-                json={"content": new_content}
-            )
-            patch_resp.raise_for_status()
-        except Exception as e:
-            print("Error adding credit to post:", e)
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # DEV=1 keeps auto-reload for local work; reload and multiple workers are mutually exclusive
+    if os.environ.get("DEV") == "1":
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        # Each worker has its own llm_executor and its own image/LLM caches, so keep the
+        # default small; uvloop/httptools are used only where uvicorn[standard] installed them
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=int(os.environ.get("WEB_CONCURRENCY", "2")),
+            loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+            http="httptools" if importlib.util.find_spec("httptools") else "auto",
+        )
@@ -0,0 +1,145 @@
+import httpx
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _photo(n):
+    return {
+        "urls": {"full": f"https://images.example/photo-{n}.jpg"},
+        "user": {"name": f"Photographer {n}", "links": {"html": f"https://unsplash.example/@p{n}"}},
+    }
+
+
+@pytest.fixture
+def client():
+    main._image_cache.clear()
+    main._llm_cache.clear()
+    # No context manager: the shutdown hook would close the shared clients and executor
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def _override(dependency, handler):
+    mock = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    main.app.dependency_overrides[dependency] = lambda: mock
+
+
+def test_get_random_image_rotates_cached_pool(client):
+    calls = []
+
+    def unsplash(request):
+        calls.append(request.url)
+        return httpx.Response(200, content=orjson.dumps([_photo(1), _photo(2)]))
+
+    _override(main.get_unsplash_client, unsplash)
+
+    first = client.get("/get_random_image", params={"genre": "Travel"})
+    second = client.get("/get_random_image", params={"genre": "travel"})
+
+    assert first.status_code == 200
+    assert first.json()["image_url"] == "https://images.example/photo-1.jpg"
+    assert second.json()["image_url"] == "https://images.example/photo-2.jpg"
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert len(calls) == 1
+    assert calls[0].params["count"] == str(main.IMAGE_POOL_SIZE)
+
+
+def test_get_random_image_retries_after_rate_limit(client):
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, content=orjson.dumps([_photo(1)])),
+    ]
+    _override(main.get_unsplash_client, lambda request: responses.pop(0))
+
+    resp = client.get("/get_random_image", params={"genre": "food"})
+
+    assert resp.status_code == 200
+    assert resp.json()["photographer_name"] == "Photographer 1"
+    assert responses == []
+
+
+def test_get_random_image_rejects_bad_genre(client):
+    resp = client.get("/get_random_image", params={"genre": "food&client_id=x"})
+    assert resp.status_code == 422
+
+
+def test_publish_streams_image_and_sets_credit_meta(client, monkeypatch):
+    monkeypatch.setattr(main, "WP_URL", "https://wp.example/wp-json/wp/v2/posts")
+    image_bytes = b"\xff\xd8" + b"x" * 1000
+    wp_requests = []
+
+    def unsplash(request):
+        return httpx.Response(200, content=image_bytes, headers={"Content-Length": str(len(image_bytes))})
+
+    def wp(request):
+        wp_requests.append(request)
+        if request.url.path.endswith("/posts"):
+            return httpx.Response(201, json={"id": 42})
+        if request.url.path.endswith("/media"):
+            return httpx.Response(201, json={"id": 7})
+        return httpx.Response(200, json={})
+
+    _override(main.get_unsplash_client, unsplash)
+    _override(main.get_wp_client, wp)
+
+    resp = client.post("/publish", json={
+        "title": "Hello",
+        "content": "<p>Body</p>",
+        "status": "draft",
+        "featured_image_url": "https://images.example/photo-1.jpg",
+        "photographer_name": "Ann",
+        "photographer_link": "https://unsplash.example/@ann",
+    })
+
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "detail": "Post successfully draft to WordPress!",
+        "postId": 42,
+        "featuredImageUrl": "https://images.example/photo-1.jpg",
+    }
+
+    create, upload = wp_requests[:2]
+    assert orjson.loads(create.content) == {
+        "title": "Hello",
+        "content": "<p>Body</p>",
+        "status": "draft",
+        "meta": {"photographer_name": "Ann", "photographer_link": "https://unsplash.example/@ann"},
+    }
+    assert upload.headers["Content-Disposition"] == 'attachment; filename="unsplash-42.jpg"'
+    assert upload.headers["Content-Length"] == str(len(image_bytes))
+    assert upload.content == image_bytes
+
+    updates = {r.url.path: orjson.loads(r.content) for r in wp_requests[2:]}
+    assert updates == {
+        "/wp-json/wp/v2/media/7": {"alt_text": "https://images.example/photo-1.jpg by Ann"},
+        "/wp-json/wp/v2/posts/42": {"featured_media": 7},
+    }
+
+
+def test_body_limit_rejects_chunked_upload(client):
+    def chunks():
+        for _ in range(main.MAX_BODY_BYTES // 65536 + 2):
+            yield b"x" * 65536
+
+    resp = client.post("/generate_blog", content=chunks(), headers={"Content-Type": "application/json"})
+
+    assert resp.status_code == 413
+
+
+def test_llm_results_are_cached_unless_fresh(client, monkeypatch):
+    calls = []
+
+    def fake_writer(outline, writing_style=None, length_type="medium"):
+        calls.append(outline)
+        return f"post {len(calls)}"
+
+    monkeypatch.setattr(main.blog, "writer_gpt", fake_writer)
+    body = {"outline": "intro, body", "length_type": "short"}
+
+    assert client.post("/generate_blog", json=body).json() == {"blog_post": "post 1"}
+    assert client.post("/generate_blog", json=body).json() == {"blog_post": "post 1"}
+    assert client.post("/generate_blog", json={**body, "fresh": True}).json() == {"blog_post": "post 2"}
+    assert len(calls) == 2
@@ -0,0 +1,36 @@
+<?php
+/**
+ * Plugin Name: Unsplash Photo Credit
+ * Description: Renders the Unsplash photographer credit from the post meta set by the blog maker backend.
+ *
+ * Drop this file into wp-content/mu-plugins/.
+ */
+
+add_action('init', function () {
+    foreach (['photographer_name', 'photographer_link'] as $key) {
+        register_post_meta('post', $key, [
+            'type'          => 'string',
+            'single'        => true,
+            'show_in_rest'  => true,
+            'auth_callback' => function () {
+                return current_user_can('edit_posts');
+            },
+        ]);
+    }
+});
+
+add_filter('the_content', function ($content) {
+    $post_id = get_the_ID();
+    $name = get_post_meta($post_id, 'photographer_name', true);
+    if (!$name) {
+        return $content;
+    }
+    $link = get_post_meta($post_id, 'photographer_link', true);
+
+    return $content . sprintf(
+        '<p style="font-size:small;">Photo by <a href="%s" target="_blank" rel="noopener">%s</a> on '
+        . '<a href="https://unsplash.com" target="_blank" rel="noopener">Unsplash</a>.</p>',
+        esc_url($link),
+        esc_html($name)
+    );
+});